@@ -2,18 +2,257 @@
 
 import numpy as np
 
-def weibull(a, scale=1):
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        '''Stand-in for numba.njit when numba is not installed: return the 
+        function uncompiled.'''
+
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# shared generator for samplers built without an explicit generator
+RNG = np.random.default_rng()
+
+# single weibull() draws are popped from batches of standard Weibull samples, one
+# batch per shape parameter: shape parameter -> [list of samples, next index]
+_WEIBULL_BATCH = 4096
+_weibull_batches = {}
+
+# opt-in: draw Weibull samples by inversion of standard exponential samples instead
+# of Generator.weibull; faster, but not bit-identical, so seeded runs change. Read 
+# when a sampler is built or a batch is drawn
+WEIBULL_INVERSION = False
+
+# positional argument order of supported distributions, see numpy.random documentation
+DIST_ARG_ORDER = {
+    'uniform': ('low', 'high'),
+    'normal': ('loc', 'scale'),
+    'exponential': ('scale',),
+    'triangular': ('left', 'mode', 'right'),
+    'gamma': ('shape', 'scale'),
+    'lognormal': ('mean', 'sigma'),
+}
+
+def seed(seed=None):
+    '''Reseed the shared generator RNG in place, so samplers already built on it
+    draw from the new stream.
+
+    Arguments:
+        seed (int, SeedSequence or None): seed for the generator, None for fresh 
+            entropy.
+    '''
+
+    RNG.bit_generator.state = np.random.default_rng(seed).bit_generator.state
+    _weibull_batches.clear()
+
+def weibull_inversion(rng, a, size):
+    '''Draw samples from the standard (scale 1) Weibull distribution by inversion, 
+    E**(1/a) for standard exponential samples E. Same distribution as 
+    numpy.random.Generator.weibull, but some samples differ in the last bit.
+
+    Arguments:
+        rng (numpy.random.Generator): generator to draw from.
+        a (scalar): shape parameter of distribution, > 0.
+        size (int): number of samples to draw.
+
+    Returns:
+        ndarray: drawn samples.
+    '''
+
+    return np.power(rng.standard_exponential(size), 1/a)
+
+def standard_weibull(rng, a, size):
+    '''Draw samples from the standard (scale 1) Weibull distribution with 
+    Generator.weibull, or with weibull_inversion if WEIBULL_INVERSION is set.
+
+    Arguments:
+        rng (numpy.random.Generator): generator to draw from.
+        a (scalar): shape parameter of distribution.
+        size (int): number of samples to draw.
+
+    Returns:
+        ndarray: drawn samples.
+    '''
+
+    if WEIBULL_INVERSION and a > 0:
+        return weibull_inversion(rng, a, size)
+    return rng.weibull(a, size)
+
+def weibull(a, scale=1, size=None):
     '''Draw sample from two-parameter Weibull distribution. Similar to 
-    numpy.random.weibull, but with added scale parameter. See scipy.org
-    for documentation.
+    numpy.random.Generator.weibull, but with added scale parameter. See scipy.org
+    for documentation. Single samples are scaled standard Weibull samples taken 
+    from a batch drawn in advance.
 
     Arguments:
         a (scalar): shape parameter of distribution.
         scale (scalar): scale parameter of distribution.
+        size (int or None): number of samples to draw, None for a single sample.
+
+    Returns:
+        scalar or ndarray: drawn sample(s) from two-parameter Weibull distribution.
+    '''
+
+    if size is not None:
+        return scale*standard_weibull(RNG, a, size)
+
+    batch = _weibull_batches.get(a)
+    if batch is None or batch[1] == _WEIBULL_BATCH:
+        batch = _weibull_batches[a] = [standard_weibull(RNG, a, _WEIBULL_BATCH).tolist(), 0]
+    sample = batch[0][batch[1]]
+    batch[1] += 1
+    return scale*sample
+
+def dist_args(prob_dist, params):
+    '''Convert a distribution parameter dictionary to a tuple of positional 
+    arguments, to avoid unpacking keyword arguments on every draw.
+
+    Arguments:
+        prob_dist (string): name of the distribution.
+        params (dict): dictionary of parameters for the distribution.
 
     Returns:
-        scalar: drawn sample from two-parameter Weibull distribution.
+        tuple or None: positional arguments for the distribution, or None if the
+            distribution is not in DIST_ARG_ORDER or params does not give every 
+            argument.
     '''
 
-    return scale*np.random.weibull(a)
+    order = DIST_ARG_ORDER.get(prob_dist)
+    if order is None or set(params) != set(order):
+        return None
+    return tuple(params[key] for key in order)
+
+def make_sampler(prob_dist, params, rng=None):
+    '''Build a function drawing a batch of samples from a distribution. Uniform, 
+    normal and exponential distributions are specialized to an affine transform 
+    of standard samples, and Weibull distributions to scaled standard Weibull 
+    samples (drawn by weibull_inversion if WEIBULL_INVERSION is set); other 
+    distributions call the Generator method with pre-extracted arguments.
+
+    Arguments:
+        prob_dist (string): name of the distribution.
+        params (dict): dictionary of parameters for the distribution.
+        rng (numpy.random.Generator or None): generator to draw from, None for 
+            the shared generator RNG.
+
+    Returns:
+        function: function of the batch size returning an ndarray of samples.
+    '''
+
+    if rng is None:
+        rng = RNG
+    keys = set(params)
+    if prob_dist == 'uniform' and keys == {'low', 'high'}:
+        low, width = params['low'], params['high'] - params['low']
+        return lambda size: low + width*rng.random(size)
+    if prob_dist == 'normal' and keys == {'loc', 'scale'}:
+        loc, scale = params['loc'], params['scale']
+        return lambda size: loc + scale*rng.standard_normal(size)
+    if prob_dist == 'exponential' and keys == {'scale'}:
+        scale = params['scale']
+        return lambda size: scale*rng.standard_exponential(size)
+    if prob_dist == 'weibull' and keys in ({'a'}, {'a', 'scale'}):
+        a, scale = params['a'], params.get('scale', 1)
+        if WEIBULL_INVERSION and a > 0:
+            return lambda size: scale*weibull_inversion(rng, a, size)
+        rng_weibull = rng.weibull
+        return lambda size: scale*rng_weibull(a, size)
+
+    dist_func = getattr(rng, prob_dist)
+    args = dist_args(prob_dist, params)
+    if args is None:
+        return lambda size: dist_func(size=size, **params)
+    return lambda size: dist_func(*args, size=size)
+
+@njit(cache=True)
+def sort_scheduled(crit_times):
+    '''Find the slots with a scheduled critical time (> 0) in a table of critical
+    times. Compiled with numba when it is installed.
+
+    Arguments:
+        crit_times (ndarray): critical time of every slot.
+
+    Returns:
+        ndarray: indices of slots with critical time > 0, in ascending order of 
+            critical time (ties keep slot order).
+    '''
+
+    scheduled = np.nonzero(crit_times > 0)[0]
+    return scheduled[np.argsort(crit_times[scheduled], kind='mergesort')]
+
+@njit(cache=True)
+def find_flagged(crit_times):
+    '''Find the slots flagged as awaiting a worker (critical time of -1) in a 
+    table of critical times. Compiled with numba when it is installed.
+
+    Arguments:
+        crit_times (ndarray): critical time of every slot.
+
+    Returns:
+        ndarray: indices of flagged slots, in ascending slot order.
+    '''
+
+    return np.nonzero(crit_times == -1)[0]
+
+@njit(cache=True)
+def find_due(crit_times, prod_time):
+    '''Find the slots with a scheduled critical time (> 0) at or before the current
+    production time in a table of critical times. Compiled with numba when it is 
+    installed.
+
+    Arguments:
+        crit_times (ndarray): critical time of every slot.
+        prod_time (scalar): current production/factory time of the simulation.
+
+    Returns:
+        ndarray: indices of due slots, in ascending slot order.
+    '''
+
+    return np.nonzero((crit_times > 0) & (crit_times <= prod_time))[0]
+
+@njit(cache=True)
+def match_workers(candidates, slot_process, slot_workers, slot_max_workers, idle, skills):
+    '''Assign idle workers to slots in order of priority: each candidate slot takes
+    idle workers able to do its process, in worker order, until it reaches its 
+    maximum number of workers. Compiled with numba when it is installed.
+
+    Arguments:
+        candidates (ndarray): slots to assign workers to, in order of priority.
+        slot_process (ndarray): column in skills of the process of every slot, -1 
+            for slots that take no workers.
+        slot_workers (ndarray): number of workers assigned to every slot, updated 
+            in place.
+        slot_max_workers (ndarray): maximum number of workers of every slot.
+        idle (ndarray): True for every idle worker, updated in place.
+        skills (ndarray): skills[w, p] is True if worker w can do process p.
+
+    Returns:
+        ndarray: (slot, worker) row for every assignment, in the order made.
+    '''
 
+    assignments = np.empty((idle.shape[0], 2), dtype=np.int64)
+    num_assigned = 0
+    num_idle = idle.sum()
+    for slot in candidates:
+        if num_idle == 0:
+            break
+        process = slot_process[slot]
+        if process < 0:
+            continue
+        for worker in range(idle.shape[0]):
+            if slot_workers[slot] >= slot_max_workers[slot]:
+                break
+            if idle[worker] and skills[worker, process]:
+                idle[worker] = False
+                slot_workers[slot] += 1
+                assignments[num_assigned, 0] = slot
+                assignments[num_assigned, 1] = worker
+                num_assigned += 1
+                num_idle -= 1
+    return assignments[:num_assigned]
@@ -1,21 +1,137 @@
 """Main processing script for prodsim"""
 import argparse
+import functools
+import logging
 import os
-from yaml_loader import yaml_loader
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
-def main(args):
+import numpy as np
+
+import helpers
+from yaml_loader import yaml_loader, load_simulation_time
+
+logger = logging.getLogger(__name__)
+
+def simulate(factory, sim_time):
+    '''Run a newly created factory until the simulation time is reached.
+
+    Arguments:
+        factory (Factory): factory instance to simulate.
+        sim_time (scalar): simulation time to run the factory for.
 
-    factory, sim_time = yaml_loader(args.yaml_file) # load simulation specs
-    print("Initializing Factory")
+    Returns:
+        scalar: final production time.
+    '''
+
+    logger.info("Initializing Factory")
     factory.initialize_production() # intialize first process buffers
     prod_time = factory.get_next_crit_time() # initialize factory time
 
+    debug = logger.isEnabledFor(logging.DEBUG) # only log every critical time if verbose
+
     while prod_time < sim_time:
 
-        print(prod_time)
+        if debug:
+            logger.debug('production time: %s', prod_time)
 
         factory.update_factory(prod_time)
         prod_time = factory.get_next_crit_time()
+
+    return prod_time
+
+def seed_run(seed):
+    '''Seed the random draws of a simulation run.
+
+    Arguments:
+        seed (int or SeedSequence): seed for the run.
+    '''
+
+    seed_seq = np.random.SeedSequence(seed) if isinstance(seed, int) else seed
+    helpers.seed(seed_seq)
+    random.seed(int(seed_seq.generate_state(1)[0]))
+
+def run_once(yaml_file, seed=None):
+    '''Run one simulation of the factory described in a yaml file.
+
+    Arguments:
+        yaml_file (string): path to simulation information input (.yaml) file.
+        seed (int, SeedSequence or None): seed for the random draws of the run, 
+            None to keep the current random state.
+
+    Returns:
+        Factory: factory instance at the end of the simulation.
+        scalar: final production time.
+    '''
+
+    if seed is not None:
+        seed_run(seed)
+
+    factory, sim_time = yaml_loader(yaml_file) # load simulation specs
+    return factory, simulate(factory, sim_time)
+
+def load_factory(yaml_file):
+    '''Build the factory described in a yaml file, without its simulation time.
+
+    Arguments:
+        yaml_file (string): path to simulation information input (.yaml) file.
+
+    Returns:
+        Factory: newly created factory instance.
+    '''
+
+    return yaml_loader(yaml_file)[0]
+
+def run_replication(factory_builder, until, seed):
+    '''Run one replication of a simulation in a worker process.
+
+    Arguments:
+        factory_builder (callable): picklable function without arguments returning a
+            newly created Factory.
+        until (scalar): simulation time to run the replication for.
+        seed (SeedSequence): seed for the random draws of the replication.
+
+    Returns:
+        dict: throughput of every part type, keyed by part type name.
+    '''
+
+    seed_run(seed)
+    factory = factory_builder()
+    simulate(factory, until)
+    return {part.name: part.throughput for part in factory.part_types}
+
+def run_replications(factory_builder, n_reps, until, n_workers=None, seed=None):
+    '''Run independent replications of a simulation in parallel worker processes.
+    Every replication builds its own factory and draws from its own random stream,
+    spawned from a common seed.
+
+    Arguments:
+        factory_builder (callable): picklable function without arguments returning a
+            newly created Factory, e.g. functools.partial(load_factory, yaml_file).
+        n_reps (int): number of replications.
+        until (scalar): simulation time to run each replication for.
+        n_workers (int or None): number of worker processes, None for CPU count.
+        seed (int or None): seed the replication streams are spawned from, None 
+            for fresh entropy.
+
+    Returns:
+        list of dict: throughput of every part type, keyed by part type name, for
+            every replication in order.
+    '''
+
+    seeds = np.random.SeedSequence(seed).spawn(n_reps) # independent streams
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        return list(executor.map(run_replication, repeat(factory_builder), repeat(until), seeds))
+
+def main(args):
+
+    if args.replications > 1:
+        main_replications(args)
+        return
+
+    factory, prod_time = run_once(args.yaml_file, args.seed)
         
     print('Final production time: ' + str(prod_time))
     print('Number of iterations: ' + str(factory.iterations))    
@@ -30,9 +146,40 @@ def main(args):
     #for worker in factory.workers:
     #    print(worker)
 
+def main_replications(args):
+
+    sim_time = load_simulation_time(args.yaml_file)
+    logger.info("Running %d replications on %d workers", args.replications, 
+                args.workers or os.cpu_count())
+    results = run_replications(functools.partial(load_factory, args.yaml_file), 
+                               args.replications, sim_time, args.workers, args.seed)
+
+    print('Number of replications: ' + str(args.replications))
+
+    for name in results[0]:
+        throughputs = np.array([result[name] for result in results])
+        print(name + ' throughput mean: ' + str(throughputs.mean()))
+        print(name + ' throughput std: ' + str(throughputs.std(ddof=1)))
+
 if __name__ == '__main__':
 
     parser = argparse.ArgumentParser(description='Simulate factory.')
     parser.add_argument('yaml_file', help='Simlation information input (.yaml) file.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log every critical time.')
+    parser.add_argument('-q', '--quiet', action='store_true', help='Only print the final summary.')
+    parser.add_argument('-r', '--replications', type=int, default=1, 
+                        help='Number of independent replications to run.')
+    parser.add_argument('-w', '--workers', type=int, default=None, 
+                        help='Number of worker processes for replications (default: CPU count).')
+    parser.add_argument('-s', '--seed', type=int, default=None, help='Seed for random draws.')
     args = parser.parse_args()
+
+    if args.verbose:
+        log_level = logging.DEBUG
+    elif args.quiet:
+        log_level = logging.WARNING
+    else:
+        log_level = logging.INFO
+    logging.basicConfig(stream=sys.stdout, level=log_level, format='%(message)s')
+
     main(args)
@@ -1,28 +1,42 @@
 """Collection of classes for prod-sim"""
+import heapq
+import logging
+from collections import deque
 import numpy as np
 import random as rand
-from helpers import weibull
+from helpers import HAVE_NUMBA, make_sampler, sort_scheduled, find_flagged, find_due, match_workers
+
+logger = logging.getLogger(__name__)
 
 
 class Process:
 
-    def __init__(self, name, prob_dist, params, buffer_cap, max_parts=1, max_workers=1):
+    __slots__ = ('name', 'prob_dist', 'params', 'buffer_cap', 'max_parts', 'max_workers', 
+                 'parts_in_process', '_buffer', 'next_crit_time', '_cap', '_full', 
+                 '_sample', '_buf', '_buf_idx', '_buf_size')
+
+    _kind = 0 # type tag of critical time objects, checked instead of isinstance()
+
+    def __init__(self, name, prob_dist, params, buffer_cap, max_parts=1, max_workers=1, 
+                 rng=None):
         '''Create a production process object. 
 
         Arguments:
             name (string): Unique name of the process.
             prob_dist (string): probability distrubtion characterizing the process 
-                time, choose from a numpy.random distribution 
+                time, choose from a numpy.random.Generator distribution 
                 (see numpy.random documentation at SciPy.org).
             params (dict): dictionary of parameters for selected process time
                 distribution, in simulator time units; use parameter names given 
-                for numpy.random distributions as keys for dictionary.
+                for numpy.random.Generator distributions as keys for dictionary.
             buffer_cap(scalar or None): maximum buffer capacity BEFORE the process station, 
                 use None for infinite buffer.
             max_parts (scalar or None): maximum number of parts that can be processed 
                 simulaneously.
             max_workers (scalar): maximum number of workers than can be working simultaneously
                 on a part.
+            rng (numpy.random.Generator or None): generator for process times, None 
+                for the generator shared by all processes and part types.
         '''
 
         self.name = name
@@ -32,9 +46,30 @@ class Process:
         self.max_parts = max_parts
         self.max_workers = max_workers
         self.parts_in_process = max_parts * [None] # list containing instances of PartType in process, or None
-        self.parts_in_buffer = [] # list of PartType instances in buffer, index 0 is first in line
+        self._cap = float('inf') if buffer_cap is None else buffer_cap # infinite buffer never fills
+        self.parts_in_buffer = deque() # sets _buffer and the cached is_buffer_full() result
         self.next_crit_time = max_parts * [-1] # initialize times of next completed processes        
 
+        # process times are drawn from the distribution in batches of _buf_size samples
+        self._sample = make_sampler(prob_dist, params, rng)
+        self._buf = None
+        self._buf_idx = 0
+        self._buf_size = 4096
+
+    @property
+    def parts_in_buffer(self):
+        '''Deque of PartType instances in buffer, index 0 is first in line. Change it 
+            in place only through add_to_buffer() and remove_first_in_buffer(), which
+            keep the cached is_buffer_full() result current; assigning a new sequence
+            also refreshes it.'''
+
+        return self._buffer
+
+    @parts_in_buffer.setter
+    def parts_in_buffer(self, parts):
+        self._buffer = deque(parts)
+        self._full = len(self._buffer) >= self._cap
+
     def __str__(self):
         return "{} with {} in process and {} in buffer".format(self.name, len(self.parts_in_process), len(self.parts_in_buffer))
 
@@ -51,18 +86,16 @@ class Process:
                 num_workers (scalar): number of workers assigned to process.
             '''
         
-        if None in self.parts_in_process:
-            # part_index = next(ind for ind, val in enumerate(self.parts_in_process) if val is None)
+        if self.parts_in_process[part_index] is None:
 
             # if parts and workers are available, start process
-            if self.parts_in_buffer and num_workers > 0:
+            if self._buffer and num_workers > 0:
                 self.update_next_crit_time(prod_time, part_index, num_workers)
-                self.parts_in_process[part_index] = self.parts_in_buffer[0]
-                self.remove_first_in_buffer()
+                self.parts_in_process[part_index] = self.remove_first_in_buffer()
                 return True
 
             # if parts are available but no workers, put flag in dictionary
-            elif self.parts_in_buffer and num_workers == 0:
+            elif self._buffer and num_workers == 0:
                 self.next_crit_time[part_index] = -1
 
             #otherwise
@@ -81,12 +114,12 @@ class Process:
             scalar: process time [units: simulator time units].
         '''
 
-        if self.prob_dist == 'weibull': 
-            prob_dist_func = weibull
-        else:
-            prob_dist_func = getattr(np.random, self.prob_dist)
+        if self._buf is None or self._buf_idx >= self._buf_size:
+            self._buf = self._sample(self._buf_size).tolist()
+            self._buf_idx = 0
 
-        process_time = prob_dist_func(**self.params)
+        process_time = self._buf[self._buf_idx]
+        self._buf_idx += 1
         return process_time
 
     def update_next_crit_time(self, prod_time, part_index, num_workers):
@@ -124,39 +157,50 @@ class Process:
             boolean: True if buffer is full, False otherwise.
         '''
 
-        if self.buffer_cap is None:
-            return False
-        elif len(self.parts_in_buffer) < self.buffer_cap:
-            return False
-        else:
-            return True
+        return self._full
 
     def add_to_buffer(self, part):
         '''Add part to end of buffer.'''
 
-        self.parts_in_buffer.append(part)
+        self._buffer.append(part)
+        self._full = len(self._buffer) >= self._cap
 
     def remove_first_in_buffer(self):
-        '''Remove part from first position in buffer.'''
+        '''Remove part from first position in buffer.
+
+        Returns:
+            PartType: removed part.
+        '''
 
-        self.parts_in_buffer = self.parts_in_buffer[1:]
+        part = self._buffer.popleft()
+        if self._full:
+            self._full = len(self._buffer) >= self._cap
+        return part
 
 
 class PartType:
 
-    def __init__(self, name, arrival_prob_dist, arrival_params, process_stations):
+    __slots__ = ('name', 'arrival_prob_dist', 'arrival_params', 'process_stations', 
+                 'next_crit_time', 'num_arrivals', 'throughput', '_next_by_station', 
+                 '_sample', '_buf', '_buf_idx', '_buf_size')
+
+    _kind = 1 # type tag of critical time objects, checked instead of isinstance()
+
+    def __init__(self, name, arrival_prob_dist, arrival_params, process_stations, rng=None):
         '''Create a part type object.
 
         Arguments:
             name (string): unique string name for part type.
             arrival_prob_dist (string): probability distrubtion characterizing the 
-                interarrival time, choose from a numpy.random distribution 
+                interarrival time, choose from a numpy.random.Generator distribution 
                 (see numpy.random documentation at SciPy.org).
             arrival_params (dict): dictionary of parameters for selected interarrival 
                 time distribution, in simulator time units; use parameter names given 
-                for numpy.random distributions as keys for dictionary.
+                for numpy.random.Generator distributions as keys for dictionary.
             process_stations (list of Process objects): ordered list of Process objects representing the
                 production line for the part. 
+            rng (numpy.random.Generator or None): generator for interarrival times, None 
+                for the generator shared by all processes and part types.
         '''
 
         self.name = name
@@ -167,6 +211,18 @@ class PartType:
         self.num_arrivals = 0
         self.throughput = 0
 
+        # map each process to the next process in line after its first position in the 
+        # production line (None after the last process)
+        self._next_by_station = {}
+        for process, next_process in zip(process_stations, list(process_stations[1:]) + [None]):
+            self._next_by_station.setdefault(process, next_process)
+
+        # interarrival times are drawn from the distribution in batches of _buf_size samples
+        self._sample = make_sampler(arrival_prob_dist, arrival_params, rng)
+        self._buf = None
+        self._buf_idx = 0
+        self._buf_size = 4096
+
     def __str__(self):
         return self.name
 
@@ -180,8 +236,12 @@ class PartType:
             scalar: part arrival time [units: simulator time units].
         '''
 
-        prob_dist_func = getattr(np.random, self.arrival_prob_dist)
-        arrival_time = prob_dist_func(**self.arrival_params)
+        if self._buf is None or self._buf_idx >= self._buf_size:
+            self._buf = self._sample(self._buf_size).tolist()
+            self._buf_idx = 0
+
+        arrival_time = self._buf[self._buf_idx]
+        self._buf_idx += 1
         return arrival_time
 
     def update_next_crit_time(self, prod_time):
@@ -191,7 +251,7 @@ class PartType:
             prod_time (scalar): current production/factory time of the simulation.
         '''
 
-        self.next_crit_time = [self.get_next_crit_time() + prod_time]
+        self.next_crit_time[0] = self.get_next_crit_time() + prod_time
 
     def end_process(self, process, part_index):
         '''End a process and updates next process buffer, assuming process currently has 
@@ -205,26 +265,26 @@ class PartType:
             boolean: True if process ended, False if not
         '''
         
-        if process in self.process_stations and process.parts_in_process[part_index] == self:
-            proc_index = self.process_stations.index(process)
-
-            # process is last process
-            if proc_index == len(self.process_stations) - 1:
-                process.parts_in_process[part_index] = None
-                process.next_crit_time[part_index] = 0
-                self.throughput += 1
-                return True
-            # process is not last process and next process has room in buffer
-            elif not self.process_stations[proc_index + 1].is_buffer_full():
-                process.parts_in_process[part_index] = None
-                process.next_crit_time[part_index] = 0
-                self.process_stations[proc_index + 1].add_to_buffer(self)
-                return True
-            # process cannot be ended
-            else:
-                process.next_crit_time[part_index] = 0 # set to 0 so simulator can try ending on next critical time
-        
-        return False
+        if process not in self._next_by_station or process.parts_in_process[part_index] is not self:
+            return False
+        next_process = self._next_by_station[process]
+
+        # process is last process
+        if next_process is None:
+            process.parts_in_process[part_index] = None
+            process.next_crit_time[part_index] = 0
+            self.throughput += 1
+            return True
+        # process is not last process and next process has room in buffer
+        elif not next_process._full: # inlined next_process.is_buffer_full()
+            process.parts_in_process[part_index] = None
+            process.next_crit_time[part_index] = 0
+            next_process.add_to_buffer(self)
+            return True
+        # process cannot be ended
+        else:
+            process.next_crit_time[part_index] = 0 # set to 0 so simulator can try ending on next critical time
+            return False
 
     def add_arriving_part(self, prod_time):
         '''Add an arriving part to the buffer of the first process for the part, 
@@ -236,7 +296,7 @@ class PartType:
 
         first_process = self.process_stations[0]
 
-        if not first_process.is_buffer_full():
+        if not first_process._full: # inlined first_process.is_buffer_full()
             first_process.add_to_buffer(self)
             self.num_arrivals += 1
 
@@ -244,6 +304,8 @@ class PartType:
 
 class Worker:
 
+    __slots__ = ('name', 'skills', '_skill_set', 'task', 'idleTime', 'part')
+
     def __init__(self, name, skills, task = None, idleTime = 0):
         """ Initializes a single worker.
         Arguments:
@@ -253,6 +315,7 @@ class Worker:
             idleTime: a counter that stores idle time.
         """
         self.skills = skills
+        self._skill_set = frozenset(skills) # hashed membership test for can_do()
         self.name = name
         self.task = task
         self.idleTime = idleTime
@@ -273,7 +336,7 @@ class Worker:
             boolean: True if task is assigned, False otherwise.'''
 
         process = task
-        if process.name in self.skills:
+        if process.name in self._skill_set:
             self.task = process
             return True
         # print(self.name, " cannot do task: ", process.name)
@@ -283,15 +346,164 @@ class Worker:
         self.part = part
 
     def can_do(self, process):
-        if process.name in self.skills:
-            return True
-        return False
+        return process.name in self._skill_set
 
     def get_name(self):
         return self.name
 
+class CalendarQueue:
+
+    __slots__ = ('num_buckets', 'bucket_width', 'min_buckets', 'buckets', 'tree', 'i_star', 'size')
+
+    def __init__(self, num_buckets=16, bucket_width=1.0):
+        '''Create a calendar queue of events, a priority queue with amortized O(1)
+            insertion and extract-min. Events are tuples whose first element is the
+            event time; later events are kept in an array of unsorted buckets that each
+            cover bucket_width of simulator time, and only the events of the current
+            bucket are kept sorted in a small binary heap.
+
+        Arguments:
+            num_buckets (scalar): initial number of buckets; the number of buckets is
+                doubled or halved as the queue grows or shrinks.
+            bucket_width (scalar): initial width of each bucket, in simulator time units;
+                re-estimated from the queued events on every resize.
+        '''
+
+        self.num_buckets = num_buckets
+        self.bucket_width = bucket_width
+        self.min_buckets = num_buckets
+        self.buckets = [[] for _ in range(num_buckets)] # unsorted lists of future events
+        self.tree = [] # binary heap of events in the current bucket
+        self.i_star = 0 # absolute index, time // bucket_width, of the current bucket
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, event):
+        '''Add an event to the queue.
+
+        Arguments:
+            event (tuple): event tuple, beginning with the event time.
+        '''
+
+        i = int(event[0] / self.bucket_width)
+        if i <= self.i_star:
+            heapq.heappush(self.tree, event)
+        else:
+            self.buckets[i % self.num_buckets].append(event)
+        self.size += 1
+
+        if self.size > 2 * self.num_buckets:
+            self.resize(2 * self.num_buckets)
+
+    def peek(self):
+        '''Return the earliest event without removing it from the queue.
+
+        Returns:
+            tuple: earliest event, or None if the queue is empty.
+        '''
+
+        if not self.tree:
+            if not self.size:
+                return None
+            self.advance()
+        return self.tree[0]
+
+    def pop(self):
+        '''Remove and return the earliest event in the queue.
+
+        Returns:
+            tuple: earliest event.
+        '''
+
+        if self.peek() is None:
+            raise IndexError('pop from empty calendar queue')
+        event = heapq.heappop(self.tree)
+        self.size -= 1
+
+        if self.size < self.num_buckets // 2 and self.num_buckets > self.min_buckets:
+            self.resize(self.num_buckets // 2)
+        return event
+
+    def advance(self):
+        '''Advance the current bucket to the next bucket holding events, and move 
+            those events into the heap. Jump directly to the earliest event if a 
+            full cycle of buckets holds no current events.'''
+
+        for _ in range(self.num_buckets):
+            self.i_star += 1
+            if self.drain_bucket():
+                return
+
+        earliest = min(min(bucket) for bucket in self.buckets if bucket)
+        self.i_star = int(earliest[0] / self.bucket_width)
+        self.drain_bucket()
+
+    def drain_bucket(self):
+        '''Move the events of the current bucket into the heap.
+
+        Returns:
+            boolean: True if any events were moved, False otherwise.
+        '''
+
+        bucket = self.buckets[self.i_star % self.num_buckets]
+        if not bucket:
+            return False
+
+        width = self.bucket_width
+        later = []
+        for event in bucket:
+            if int(event[0] / width) <= self.i_star:
+                self.tree.append(event)
+            else:
+                later.append(event)
+        self.buckets[self.i_star % self.num_buckets] = later
+
+        heapq.heapify(self.tree)
+        return len(self.tree) > 0
+
+    def resize(self, num_buckets):
+        '''Redistribute all events into a new number of buckets, re-estimating the
+            bucket width from the spacing of the earliest events.
+
+        Arguments:
+            num_buckets (scalar): new number of buckets.
+        '''
+
+        events = self.tree
+        for bucket in self.buckets:
+            events.extend(bucket)
+
+        sample = heapq.nsmallest(25, events)
+        if len(sample) > 1 and sample[-1][0] > sample[0][0]:
+            # aim for a few events per bucket at the front of the queue
+            self.bucket_width = 3 * (sample[-1][0] - sample[0][0]) / (len(sample) - 1)
+
+        self.num_buckets = num_buckets
+        self.buckets = [[] for _ in range(num_buckets)]
+        self.tree = []
+        if sample:
+            self.i_star = int(sample[0][0] / self.bucket_width)
+
+        width = self.bucket_width
+        for event in events:
+            i = int(event[0] / width)
+            if i <= self.i_star:
+                self.tree.append(event)
+            else:
+                self.buckets[i % num_buckets].append(event)
+        heapq.heapify(self.tree)
+
+
 class Factory:
 
+    __slots__ = ('part_types', 'workers', 'all_processes', 'crit_time_dict', 'slots', 
+                 'slot_index', 'crit_times', '_events', '_counter', '_valid', '_front', 'iterations', 
+                 'worker_assignments', 'task_worker_counts', '_task_workers', '_worker_index', '_idle', '_skills', 
+                 '_slot_process', '_slot_max_workers', '_slot_workers', '_allocation_stale', 
+                 '_pending', '_downstream', '_upstream', '_scan_plan')
+
     def __init__(self, part_types, workers):
         '''Create a factory object.
 
@@ -305,31 +517,87 @@ class Factory:
         self.workers = workers
 
         all_processes = [] # list for storing all factory processes
+        seen_processes = set() # set of processes already in all_processes
         crit_time_dict = {} # dictionary for storing simulator critical times
 
         # intialize above lists/dictionaries
         for part in part_types:
             crit_time_dict[part] = [0]
             for process in part.process_stations:
-                if process not in all_processes:
+                if process not in seen_processes:
+                    seen_processes.add(process)
                     all_processes.append(process)
                     crit_time_dict[process] = process.max_parts * [0]
         self.all_processes = all_processes 
         self.crit_time_dict = crit_time_dict
 
+        # struct-of-arrays table of critical times, one entry per (object, part_index) slot
+        self.slots = [(crit_obj, part_index) for crit_obj in crit_time_dict 
+                      for part_index in range(len(crit_time_dict[crit_obj]))]
+        self.slot_index = {slot: i for i, slot in enumerate(self.slots)}
+        self.crit_times = np.zeros(len(self.slots))
+
+        # calendar queue of (crit_time, counter, object, part_index) events; stale
+        # events are discarded lazily when they reach the front of the queue
+        self._events = CalendarQueue()
+        self._counter = 0
+        self._valid = {} # maps (object, part_index) to (crit_time, counter) of its latest event
+        self._front = None # earliest valid event, or None if it must be looked up again
+
         self.iterations = 0
         self.worker_assignments = {} #maps workers to task
         for worker in self.workers:
             self.worker_assignments[worker] = None #initialize to idle workers.
+        self.task_worker_counts = {} # maps (process, part_index) to number of workers assigned
+        self._task_workers = {} # maps (process, part_index) to list of workers assigned
+
+        # array view of workers and skills for the compiled worker matching in allocate_workers
+        process_column = {process: i for i, process in enumerate(all_processes)}
+        self._worker_index = {worker: i for i, worker in enumerate(workers)}
+        self._idle = np.array([worker.task is None for worker in workers], dtype=np.bool_)
+        self._skills = np.array([[worker.can_do(process) for process in all_processes] 
+                                 for worker in workers], dtype=np.bool_).reshape(
+                                     len(workers), len(all_processes))
+        self._slot_process = np.array([process_column.get(crit_obj, -1) 
+                                       for crit_obj, _ in self.slots], dtype=np.int64)
+        self._slot_max_workers = np.array([crit_obj.max_workers if crit_obj in process_column else 0 
+                                           for crit_obj, _ in self.slots], dtype=np.int64)
+        self._slot_workers = np.zeros(len(self.slots), dtype=np.int64)
+        self._allocation_stale = True # False while allocate_workers() cannot assign anyone
+
+        # processes whose slots must be visited by update_factory(), and the processes 
+        # a change to each process can unblock: parts ending in a process join the 
+        # buffers downstream, and parts starting in a process make room upstream
+        self._pending = set(all_processes)
+        downstream = {process: set() for process in all_processes}
+        upstream = {process: set() for process in all_processes}
+        for part in part_types:
+            for process, next_process in zip(part.process_stations, part.process_stations[1:]):
+                downstream[process].add(next_process)
+                upstream[next_process].add(process)
+        self._downstream = {process: tuple(downstream[process]) for process in all_processes}
+        self._upstream = {process: tuple(upstream[process]) for process in all_processes}
+
+        # per-process bindings of the update_factory() loop, in visiting order; the
+        # slot lists are only ever updated in place, so one build suffices
+        self._scan_plan = tuple((process, process.parts_in_process, process.next_crit_time, 
+                                 process.start_process, self._downstream[process], 
+                                 self._upstream[process]) 
+                                for process in all_processes)
     
         # allocate lists for interesting things
 
     def get_num_workers_on_task(self, task):
-        total = 0
-        for worker in self.workers:
-            if self.worker_assignments[worker] == task:
-                total += 1
-        return total
+        '''Get the number of workers assigned to a task.
+
+        Arguments:
+            task ((Process object, part index) tuple): task to count workers on.
+
+        Returns:
+            scalar: number of workers assigned to the task.
+        '''
+
+        return self.task_worker_counts.get(task, 0)
 
     def update_factory(self, prod_time):
         '''Update the factory for current critical time: update process or incoming 
@@ -340,41 +608,67 @@ class Factory:
         '''
 
         # identify critical time process/part
-        crit_obj, crit_index = self.find_crit_time_object(prod_time)
-        #print(crit_obj.name)
-        #print(prod_time)
+        crit_obj, crit_index = self.peek_crit_time_object()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('critical time object: %s, production time: %s', crit_obj.name, prod_time)
+
+        pending = self._pending
 
         # if part type, add part to first process buffer
-        if isinstance(crit_obj, PartType):
+        if crit_obj._kind == 1:
             crit_obj.add_arriving_part(prod_time)
+            self.schedule(crit_obj, 0)
             crit_obj.process_stations[0].start_process(prod_time, 0, self.get_num_workers_on_task(crit_obj.process_stations[0]))                      #ADD NUMBER OF WORKERS ON PROCESS HERE
-        else:
-            pass
-            # print(crit_obj.parts_in_process)       
+            self.schedule(crit_obj.process_stations[0], 0)
+            pending.add(crit_obj.process_stations[0])
+
+        # processes with parts due to end their process
+        for slot in find_due(self.crit_times, prod_time).tolist():
+            due_obj = self.slots[slot][0]
+            if due_obj._kind == 0:
+                pending.add(due_obj)
+
+        # bind methods used in the loop to locals
+        schedule = self.schedule
+        allocate_workers = self.allocate_workers
+        worker_counts = self.task_worker_counts
 
         update_count = 1
         while update_count > 0:
             update_count = 0
-            for process in self.all_processes:
-                for part_index, part in enumerate(process.parts_in_process):
-                    if part is not None and process.next_crit_time[part_index] <= prod_time:
+            for process, parts_in_process, next_crit_time, start_process, downstream, upstream in self._scan_plan:
+
+                # skip the slots of processes nothing has changed for since their last
+                # visit, but still let workers freed so far be allocated; assignments
+                # mark their process pending, so they count as updates
+                if process not in pending:
+                    update_count += allocate_workers(prod_time)
+                    continue
+                pending.discard(process)
+
+                for part_index, part in enumerate(parts_in_process):
+                    if part is not None and next_crit_time[part_index] <= prod_time:
                         end_successs = part.end_process(process, part_index)
-                        update_count += end_successs
+                        schedule(process, part_index)
                         if end_successs:
+                            update_count += 1
                             self.end_work(process, part_index)
+                            pending.update(downstream)
 
-                    self.allocate_workers(prod_time)
+                    update_count += allocate_workers(prod_time)
                     # print(self.get_num_workers_on_task((process, part_index)))
-                    update_count += process.start_process(prod_time, part_index, self.get_num_workers_on_task((process, part_index)))
+                    if start_process(prod_time, part_index, worker_counts.get((process, part_index), 0)):
+                        update_count += 1
+                        pending.add(process) # earlier slots may still be flagged
+                        pending.update(upstream)
+                    schedule(process, part_index)
 
-        self.update_crit_time_dict()
-        
 
     def initialize_production(self):
         '''Initialize first processes with a part after factory creation. 
             Must run this before running update_factory() for first time.'''
         
-        print("Production Initialized")
+        logger.info("Production Initialized")
         for part in self.part_types:
             part.add_arriving_part(0)
         #for process in self.all_processes:
@@ -402,24 +696,78 @@ class Factory:
             
 
     def update_crit_time_dict(self):
-        '''Update the crit_time_dict for all processes.
+        '''Update the crit_time_dict for all processes, and reschedule every
+            critical time in the event queue.
         '''
         for process in self.crit_time_dict:
             self.crit_time_dict[process] = process.next_crit_time
+            for part_index in range(len(process.next_crit_time)):
+                self.schedule(process, part_index)
+        self._pending.update(self.all_processes)
+
+    def schedule(self, crit_obj, part_index):
+        '''Copy the current critical time of a process/part into the crit_times table
+            and push it onto the event queue, superseding any earlier event for the 
+            same object and part index.
+
+        Arguments:
+            crit_obj (Process or PartType): object whose critical time changed.
+            part_index (scalar): index of critical time in crit_obj.next_crit_time.
+        '''
+
+        time = crit_obj.next_crit_time[part_index]
+        key = (crit_obj, part_index)
+        slot = self.slot_index[key]
+        if self.crit_times[slot] != time:
+            self.crit_times[slot] = time
+            self._allocation_stale = True
+
+        front = self._front
+        if front is not None and front[2] is crit_obj and front[3] == part_index and front[0] != time:
+            self._front = front = None
+
+        if time > 0 and self._valid.get(key, (None,))[0] != time:
+            self._counter += 1
+            self._valid[key] = (time, self._counter)
+            event = (time, self._counter, crit_obj, part_index)
+            self._events.push(event)
+            if front is not None and time < front[0]:
+                self._front = event
+
+    def peek_crit_time_object(self):
+        '''Return the earliest scheduled process/part. The earliest event is cached 
+            until schedule() changes it; otherwise stale events are discarded from the 
+            front of the event queue to find it.
+
+        Returns:
+            Process or PartType: returns critical time process or part.
+            Part Index: returns part index of critical time process.
+        '''
+
+        if self._front is not None:
+            return self._front[2], self._front[3]
+
+        events = self._events
+        while events:
+            time, counter, crit_obj, part_index = events.peek()
+            key = (crit_obj, part_index)
+            if self._valid.get(key) == (time, counter):
+                if crit_obj.next_crit_time[part_index] == time:
+                    self._front = events.peek()
+                    return crit_obj, part_index
+                del self._valid[key]
+            events.pop()
+
+        return None, None
 
     def get_next_crit_time(self):
-        '''Retrieve the next critical time from the crit_time_dict, 
+        '''Retrieve the next critical time from the event queue, 
             assuming critical time is > 0.
         '''
         self.iterations += 1
 
-        times = []
-        for time_list in self.crit_time_dict.values():
-            for time in time_list:
-                if time > 0:
-                    times.append(time)
-
-        return min(times)
+        self.peek_crit_time_object()
+        return self._front[0]
 
     def allocate_workers(self, prod_time):
         """Assigns available workers to appropriate tasks. 
@@ -428,69 +776,84 @@ class Factory:
             prod_time (scalar): current production/factory time of the simulation.
         """
 
-        allocation_counter = 0
-        available_workers = self.get_available_workers()
-        flagged_processes = self.get_flagged_processes()
-
-        times = []
-        for time_list in self.crit_time_dict.values():
-            for time in time_list:
-                if time > 0:
-                    times.append(time)
-
-        times.sort() # sort critical times in ascending order
-
-        # first assign workers to parts that will finish their process the soonest
-        for time in times:
-
-            test_process, test_part_index = self.find_crit_time_object(time)
-            
-            # if test process is a PartType, skip current loop and continue to next loop
-            if isinstance(test_process, PartType):
-                continue
+        # no critical time or idle worker changed since the last allocation, which 
+        # left no idle worker able to join a task
+        if not self._allocation_stale:
+            return 0
+
+        flagged_slots = find_flagged(self.crit_times).tolist()
+        rand.shuffle(flagged_slots)
+
+        # first assign workers to parts that will finish their process the soonest, 
+        # then to parts that have not been started, but are awaiting a worker
+        if HAVE_NUMBA:
+            candidates = np.concatenate((sort_scheduled(self.crit_times), 
+                                         np.array(flagged_slots, dtype=np.int64)))
+            assignments = match_workers(candidates, self._slot_process, self._slot_workers, 
+                                        self._slot_max_workers, self._idle, self._skills).tolist()
+        else:
+            assignments = self.match_workers_python(sort_scheduled(self.crit_times).tolist() + 
+                                                    flagged_slots)
+
+        for slot, worker_index in assignments:
+            test_process, test_part_index = task = self.slots[slot]
+            worker = self.workers[worker_index]
+            workers_on_task = self.task_worker_counts.get(task, 0)
+
+            worker.assign_task(test_process)
+            worker.assign_part(test_part_index)
+            self.worker_assignments[worker] = task
+            self.task_worker_counts[task] = workers_on_task + 1
+            self._task_workers.setdefault(task, []).append(worker)
+            self._pending.add(test_process)
+            test_process.adjust_next_crit_time(prod_time, test_part_index, 
+                                               workers_on_task, workers_on_task+1)
+            self.schedule(test_process, test_part_index)
+
+        self._allocation_stale = False
+        return len(assignments)
+
+    def match_workers_python(self, candidates):
+        """Assign idle workers to slots in order of priority, like helpers.match_workers
+            but looping over the Worker objects. Used instead of the kernel when numba 
+            is not installed, where the kernel would run slowly on numpy scalars.
 
-            workers_on_task = self.get_num_workers_on_task((test_process, test_part_index))
-            
-            for worker in available_workers:
+        Arguments:
+            candidates (list): slots to assign workers to, in order of priority.
 
-                if workers_on_task >= test_process.max_workers:
-                    break
+        Returns:
+            List of (slot, worker index) tuples for every assignment, in the order made.
+        """
 
-                if worker.can_do(test_process):
-                    worker.assign_task(test_process)
-                    # print("worker assigned to ", test_process.name)
-                    worker.assign_part(test_part_index)
-                    self.worker_assignments[worker] = (test_process, test_part_index)
-                    test_process.adjust_next_crit_time(prod_time, test_part_index, 
-                                                       workers_on_task, workers_on_task+1)
-                    workers_on_task += 1
-                    allocation_counter += 1
-                    available_workers = self.get_available_workers()
+        workers = self.workers
+        idle = self._idle.tolist()
+        available_workers = [worker_index for worker_index, is_idle in enumerate(idle) if is_idle]
+        num_idle = len(available_workers)
+        assignments = []
 
-        # then assign workers to parts that have not been started, but are awaiting a worker
-        rand.shuffle(flagged_processes)
-        for flag in flagged_processes:
+        for slot in candidates:
+            if num_idle == 0:
+                break
 
-            (test_process, test_part_index) = flag
-            workers_on_task = self.get_num_workers_on_task((test_process, test_part_index))
-            
-            for worker in available_workers:
+            # skip PartType slots, which take no workers
+            test_process, test_part_index = self.slots[slot]
+            if test_process._kind == 1:
+                continue
 
+            workers_on_task = self.task_worker_counts.get((test_process, test_part_index), 0)
+            for worker_index in available_workers:
                 if workers_on_task >= test_process.max_workers:
                     break
-
-                if worker.can_do(test_process):
-                    worker.assign_task(test_process)
-                    # print("worker assigned to ", test_process.name, " index ", str(test_part_index))
-                    worker.assign_part(test_part_index)
-                    self.worker_assignments[worker] = (test_process, test_part_index)
-                    test_process.adjust_next_crit_time(prod_time, test_part_index, 
-                                                       workers_on_task, workers_on_task+1)
+                if idle[worker_index] and workers[worker_index].can_do(test_process):
+                    idle[worker_index] = False
+                    num_idle -= 1
                     workers_on_task += 1
-                    allocation_counter += 1
-                    available_workers = self.get_available_workers()
+                    self._slot_workers[slot] = workers_on_task
+                    assignments.append((slot, worker_index))
 
-        return allocation_counter
+        for _, worker_index in assignments:
+            self._idle[worker_index] = False
+        return assignments
 
     def end_work(self, process, part_index):
         """End work for workers for a specified process and part index.
@@ -500,11 +863,17 @@ class Factory:
             part_index (scalar): index of part in process for work to be ended.            
         """
 
-        for worker in self.worker_assignments:
-            if self.worker_assignments[worker] == (process, part_index):
-                self.worker_assignments[worker] = None
-                worker.task = None
-                worker.part = None
+        task = (process, part_index)
+        if not self.task_worker_counts.pop(task, 0):
+            return
+        self._slot_workers[self.slot_index[task]] = 0
+        self._allocation_stale = True
+
+        for worker in self._task_workers.pop(task):
+            self.worker_assignments[worker] = None
+            self._idle[self._worker_index[worker]] = True
+            worker.task = None
+            worker.part = None
 
     def get_available_workers(self):
         """Create a list of unassigned workers.
@@ -513,13 +882,7 @@ class Factory:
             List of worker objects that are unassigned to a task.
         """
 
-        avail_workers = []
-
-        for worker in self.workers:
-            if worker.task is None:
-                avail_workers.append(worker)
-
-        return avail_workers
+        return [worker for worker, idle in zip(self.workers, self._idle.tolist()) if idle]
 
     def get_flagged_processes(self):
         """ Return list of process for production once worker is available.
@@ -529,10 +892,4 @@ class Factory:
                 to begin production once worker is available. 
         """
 
-        process_list = []
-        for process in self.crit_time_dict:
-            for part_index, time in enumerate(self.crit_time_dict[process]):
-                if time == -1:
-                    process_list.append((process, part_index))
-
-        return process_list
+        return [self.slots[slot] for slot in find_flagged(self.crit_times).tolist()]
@@ -1,9 +1,56 @@
 '''Method for loading yaml file into prodsim class objects.'''
 import yaml
 import argparse
+import copy
+import functools
 import os
+from operator import itemgetter
 from prod_objects import Process, Factory, PartType, Worker
 
+try:
+    from yaml import CSafeLoader as SafeLoader # libyaml-backed parser
+except ImportError:
+    from yaml import SafeLoader
+
+# Process and PartType constructor arguments, in order, from their .yaml entries
+_PROCESS_FIELDS = itemgetter('name', 'distribution', 'parameters', 'buffer_size', 
+                             'max_parts_in_process', 'max_workers_per_part')
+_PART_TYPE_FIELDS = itemgetter('part_name', 'part_arrival_distribution', 
+                               'part_arrival_parameters')
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_yaml(path, mtime):
+    '''Parse a yaml file, caching the result by path and modification time so 
+        repeated runs on an unchanged file skip parsing.
+
+        Arguments:
+            path (string): absolute path of .yaml file.
+            mtime (scalar): modification time of .yaml file, part of the cache key.
+
+        Returns:
+            dict: parsed contents of .yaml file; callers must not modify it.
+        '''
+
+    with open(path) as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+
+def load_simulation_time(input_file):
+    '''Read the simulation time of a yaml file without building the factory.
+
+        Arguments:
+            input_file (.yaml file): .yaml file detailing factory 
+                specifications/information 
+
+        Returns:
+            sim_time (scalar): simulation time in consistent units specified 
+                in input file
+        '''
+
+    path = os.path.abspath(input_file)
+    return _parse_yaml(path, os.path.getmtime(path))['simulation_time']
+
 
 def yaml_loader(input_file):
     '''Load yaml file into factory simulation objects.
@@ -19,60 +66,36 @@ def yaml_loader(input_file):
                 in input file
         '''
 
-    with open(input_file) as f:
-        data = yaml.load(f, Loader=yaml.FullLoader)
-
-        # access data file inputs
-        processes_input = data['processes']
-        part_types_input = data['part_types']
-        workers_input = data['workers']
-        sim_time = data['simulation_time']
-
-        # create list of all process objects
-        process_objects = []
-        for process in processes_input:
-            process_name = process['name']
-            process_dist = process['distribution']
-            process_params = process['parameters']
-            process_buffer = process['buffer_size']
-            process_max_parts = process['max_parts_in_process']
-            process_max_workers = process['max_workers_per_part']
-            process_instance = Process(
-                process_name, process_dist, process_params, process_buffer, process_max_parts, process_max_workers)
-            process_objects.append(process_instance)
-
-        process_dict = {} # map process name to object
-        for process in process_objects:
-            process_dict[process.name] = process
-
-        # create list of part type objects
-        part_type_objects = []
-        for part in part_types_input:
-            part_type_name = part['part_name']
-            part_arrival_dist = part['part_arrival_distribution']
-            part_arrival_params = part['part_arrival_parameters']
-            process_name_list = part['process_list']
-
-            process_list = []
-            for name in process_name_list:
-                process_list.append(process_dict[name])
-
-            part_type_inst = PartType(
-                part_type_name, part_arrival_dist, part_arrival_params, process_list)
-            part_type_objects.append(part_type_inst)
-
-        #create workers
-        worker_objects = []
-        for worker in workers_input:
-            for i in range(0,worker['quantity']):
-                worker_name = worker['name'] + str(i)
-                worker_skills = worker['skills']
-                worker_objects.append(Worker(worker_name, worker_skills))
-
-        # create factory object
-        factory_object = Factory(part_type_objects, worker_objects)
-
-        return factory_object, sim_time
+    path = os.path.abspath(input_file)
+    data = copy.deepcopy(_parse_yaml(path, os.path.getmtime(path)))
+
+    # access data file inputs
+    processes_input = data['processes']
+    part_types_input = data['part_types']
+    workers_input = data['workers']
+    sim_time = data['simulation_time']
+
+    # create list of all process objects
+    process_objects = [Process(*_PROCESS_FIELDS(process)) for process in processes_input]
+    process_dict = {process.name: process for process in process_objects} # map process name to object
+
+    # create list of part type objects
+    part_type_objects = [PartType(*_PART_TYPE_FIELDS(part), 
+                                  list(map(process_dict.__getitem__, part['process_list'])))
+                         for part in part_types_input]
+
+    #create workers
+    worker_objects = []
+    for worker in workers_input:
+        for i in range(0,worker['quantity']):
+            worker_name = worker['name'] + str(i)
+            worker_skills = worker['skills']
+            worker_objects.append(Worker(worker_name, worker_skills))
+
+    # create factory object
+    factory_object = Factory(part_type_objects, worker_objects)
+
+    return factory_object, sim_time
 
         
 if __name__ == '__main__':
@@ -19,6 +19,8 @@ TEST_REQUIRES = ['numpy']
 
 DOCS_REQUIRES = []
 
+JIT_REQUIRES = ['numba']
+
 with open("README.md", "r") as fh:
     long_description = fh.read()
 
@@ -64,6 +66,7 @@ setup(
     extras_require={
         'test': TEST_REQUIRES + INSTALL_REQUIRES,
         'docs': DOCS_REQUIRES + INSTALL_REQUIRES,
+        'jit': JIT_REQUIRES + INSTALL_REQUIRES,
     },
 
     packages=find_packages(),
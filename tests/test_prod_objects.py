@@ -3,8 +3,10 @@
 import unittest
 import numpy as np
 import copy
+from collections import deque
 
-from prodsim.prod_objects import Process, Factory, PartType
+from prodsim.prod_objects import Process, Factory, PartType, Worker, CalendarQueue
+import helpers # same module as imported by prod_objects
 
 
 class TestProcessMethods(unittest.TestCase):
@@ -12,7 +14,7 @@ class TestProcessMethods(unittest.TestCase):
 
     def setUp(self):
         self.process_instance = Process(
-            'test', 'uniform', {'low': 2, 'high': 4}, 3, 1)
+            'test', 'uniform', {'low': 2, 'high': 4}, 3, 1, rng=np.random.default_rng(0))
         self.part_type_inst1 = PartType(
             'test_part1', 'uniform', {'low': 1, 'high': 5}, [self.process_instance])
         self.part_type_inst2 = PartType(
@@ -55,11 +57,9 @@ class TestProcessMethods(unittest.TestCase):
         '''Test Process.start_process() method with no part in
             process and parts in buffer.'''
         sample_prod_time = 5
-        np.random.seed(0)
-        pt = np.random.uniform(low=2, high=4)
-        np.random.seed(0)
+        pt = np.random.default_rng(0).uniform(low=2, high=4)
         self.process_instance.parts_in_buffer = \
-            [self.part_type_inst1, self.part_type_inst2, self.part_type_inst3]
+            deque([self.part_type_inst1, self.part_type_inst2, self.part_type_inst3])
         self.process_instance.start_process(sample_prod_time)
 
         test_parts = self.process_instance.max_parts * [None]
@@ -70,22 +70,55 @@ class TestProcessMethods(unittest.TestCase):
         test_crit_time[0] = sample_prod_time + pt
         self.assertTrue(self.process_instance.next_crit_time == test_crit_time)
 
-        self.assertTrue(self.process_instance.parts_in_buffer ==
+        self.assertTrue(list(self.process_instance.parts_in_buffer) ==
                         [self.part_type_inst2, self.part_type_inst3])
 
+    def test_start_process_occupied_slot(self):
+        '''Test Process.start_process() method leaves an occupied slot untouched
+            while another slot is free.'''
+        process = Process('test', 'uniform', {'low': 2, 'high': 4}, 3, 2)
+        process.parts_in_process[0] = self.part_type_inst1
+        process.next_crit_time[0] = 7
+        process.add_to_buffer(self.part_type_inst2)
+        self.assertFalse(process.start_process(5, 0, 1))
+        self.assertTrue(process.parts_in_process == [self.part_type_inst1, None])
+        self.assertTrue(process.next_crit_time[0] == 7)
+        self.assertTrue(process.start_process(5, 1, 1))
+        self.assertTrue(process.parts_in_process == [self.part_type_inst1, self.part_type_inst2])
+
     def test_get_next_crit_time(self):
         '''Test Process.get_next_crit_time() method.'''
         process_time = self.process_instance.get_next_crit_time()
         self.assertTrue(2 <= process_time < 4)
 
+    def test_get_next_crit_time_batch(self):
+        '''Test Process.get_next_crit_time() draws consecutive samples from 
+            one batch.'''
+        pts = np.random.default_rng(0).uniform(low=2, high=4, size=self.process_instance._buf_size)
+        self.assertTrue(self.process_instance.get_next_crit_time() == pts[0])
+        self.assertTrue(self.process_instance.get_next_crit_time() == pts[1])
+
+    def test_get_next_crit_time_weibull(self):
+        '''Test Process.get_next_crit_time() draws Weibull samples from 
+            Generator.weibull, or by inversion if helpers.WEIBULL_INVERSION is set.'''
+        params = {'a': 3, 'scale': 2}
+        process = Process('test', 'weibull', params, 3, 1, rng=np.random.default_rng(0))
+        pt = 2*np.random.default_rng(0).weibull(3)
+        self.assertTrue(process.get_next_crit_time() == pt)
+        helpers.WEIBULL_INVERSION = True
+        try:
+            process = Process('test', 'weibull', params, 3, 1, rng=np.random.default_rng(0))
+        finally:
+            helpers.WEIBULL_INVERSION = False
+        pt = 2*np.random.default_rng(0).standard_exponential()**(1/3)
+        self.assertTrue(process.get_next_crit_time() == pt)
+
     def test_update_next_crit_time(self):
         '''Test Process.update_next_crit_time() method.'''
         sample_prod_time = 5
-        np.random.seed(0)
-        pt = np.random.uniform(low=2, high=4)
+        pt = np.random.default_rng(0).uniform(low=2, high=4)
         test_update_time = self.process_instance.max_parts * [0]
         test_update_time[0] = sample_prod_time + pt
-        np.random.seed(0)
         self.process_instance.update_next_crit_time(sample_prod_time, 0)
         self.assertTrue(self.process_instance.next_crit_time 
                         == test_update_time)
@@ -93,22 +126,41 @@ class TestProcessMethods(unittest.TestCase):
     def test_is_buffer_full(self):
         '''Test Process.is_buffer_full() method.'''
         self.assertFalse(self.process_instance.is_buffer_full())
+        self.process_instance.add_to_buffer(self.part_type_inst1)
+        self.process_instance.add_to_buffer(self.part_type_inst2)
+        self.assertFalse(self.process_instance.is_buffer_full())
+        self.process_instance.add_to_buffer(self.part_type_inst3)
+        self.assertTrue(self.process_instance.is_buffer_full())
+        self.process_instance.remove_first_in_buffer()
+        self.assertFalse(self.process_instance.is_buffer_full())
+
+    def test_is_buffer_full_unbounded(self):
+        '''Test Process.is_buffer_full() method with infinite buffer.'''
+        process = Process('test', 'uniform', {'low': 2, 'high': 4}, None, 1)
+        for _ in range(5):
+            process.add_to_buffer(self.part_type_inst1)
+        self.assertFalse(process.is_buffer_full())
+
+    def test_is_buffer_full_assigned(self):
+        '''Test Process.is_buffer_full() method after assigning parts_in_buffer.'''
         self.process_instance.parts_in_buffer = \
             [self.part_type_inst1, self.part_type_inst2, self.part_type_inst3]
         self.assertTrue(self.process_instance.is_buffer_full())
+        self.process_instance.parts_in_buffer = []
+        self.assertFalse(self.process_instance.is_buffer_full())
 
     def test_add_to_buffer(self):
         '''Test Process.add_to_buffer() method.'''
         self.process_instance.add_to_buffer(self.part_type_inst1)
-        self.assertTrue(self.process_instance.parts_in_buffer == 
+        self.assertTrue(list(self.process_instance.parts_in_buffer) == 
                         [self.part_type_inst1])
 
     def test_remove_first_in_buffer(self):
         '''Test Process.remove_first_in_buffer() method.'''
         self.process_instance.parts_in_buffer = \
-            [self.part_type_inst1, self.part_type_inst2, self.part_type_inst3]
-        self.process_instance.remove_first_in_buffer()
-        self.assertTrue(self.process_instance.parts_in_buffer ==
+            deque([self.part_type_inst1, self.part_type_inst2, self.part_type_inst3])
+        self.assertTrue(self.process_instance.remove_first_in_buffer() is self.part_type_inst1)
+        self.assertTrue(list(self.process_instance.parts_in_buffer) ==
                         [self.part_type_inst2, self.part_type_inst3])
 
 
@@ -125,7 +177,8 @@ class TestPartTypeMethods(unittest.TestCase):
         self.process_list = [self.process_instance1, self.process_instance2, 
                              self.process_instance3]
         self.part_type_inst1 = PartType(
-            'test_part1', 'uniform', {'low': 1, 'high': 5}, self.process_list)
+            'test_part1', 'uniform', {'low': 1, 'high': 5}, self.process_list, 
+            rng=np.random.default_rng(0))
 
     def test_part_type_init(self):
         '''Test PartType.__init__() method.'''
@@ -142,9 +195,7 @@ class TestPartTypeMethods(unittest.TestCase):
     def test_update_next_crit_time(self):
         '''Test PartType.updage_next_crit_time() method.'''
         sample_prod_time = 5
-        np.random.seed(0)
-        pt = np.random.uniform(low=1, high=5)
-        np.random.seed(0)
+        pt = np.random.default_rng(0).uniform(low=1, high=5)
         self.part_type_inst1.update_next_crit_time(sample_prod_time)
         self.assertTrue(self.part_type_inst1.next_crit_time 
                         == [sample_prod_time + pt])
@@ -156,7 +207,7 @@ class TestPartTypeMethods(unittest.TestCase):
         self.part_type_inst1.end_process(self.process_instance2, 0)
         self.assertTrue(self.process_instance2.parts_in_process ==
                         self.process_instance2.max_parts * [None])
-        self.assertTrue(self.process_instance3.parts_in_buffer == 
+        self.assertTrue(list(self.process_instance3.parts_in_buffer) == 
                         [self.part_type_inst1])
 
     def test_end_process2(self):
@@ -170,7 +221,7 @@ class TestPartTypeMethods(unittest.TestCase):
         test_parts[0] = self.part_type_inst1
         self.assertTrue(self.process_instance2.parts_in_process == 
                         test_parts)
-        self.assertTrue(self.process_instance3.parts_in_buffer == 
+        self.assertTrue(list(self.process_instance3.parts_in_buffer) == 
                         [self.part_type_inst1])
 
     def test_end_process3(self):
@@ -198,9 +249,7 @@ class TestPartTypeMethods(unittest.TestCase):
         '''Test PartType.add_arriving_part() method with empty first
             process buffer.'''
         sample_prod_time = 5
-        np.random.seed(0)
-        pt = np.random.uniform(low=1, high=5)
-        np.random.seed(0)    
+        pt = np.random.default_rng(0).uniform(low=1, high=5)
         self.part_type_inst1.add_arriving_part(sample_prod_time)
 
         test_crit_time = self.part_type_inst1.process_stations[0].max_parts * [0]
@@ -209,26 +258,52 @@ class TestPartTypeMethods(unittest.TestCase):
 
         test_parts = self.part_type_inst1.process_stations[0].max_parts * [None]
         test_parts[0] = self.part_type_inst1
-        self.assertTrue(self.part_type_inst1.process_stations[0].parts_in_buffer ==
+        self.assertTrue(list(self.part_type_inst1.process_stations[0].parts_in_buffer) ==
                         test_parts)
 
     def test_add_arriving_part2(self):
         '''Test PartType.add_arriving_part() method with full first
             process buffer.'''
         sample_prod_time = 5
-        np.random.seed(0)
-        pt = np.random.uniform(low=1, high=5)
-        np.random.seed(0)
+        pt = np.random.default_rng(0).uniform(low=1, high=5)
         part_type_inst2 = PartType(
             'test_part1', 'uniform', {'low': 1, 'high': 5}, self.process_list)
         self.process_instance1.add_to_buffer(part_type_inst2)
         self.part_type_inst1.add_arriving_part(sample_prod_time)
         self.assertTrue(self.part_type_inst1.next_crit_time 
                         == [sample_prod_time + pt])
-        self.assertTrue(self.part_type_inst1.process_stations[0].parts_in_buffer ==
+        self.assertTrue(list(self.part_type_inst1.process_stations[0].parts_in_buffer) ==
                         [part_type_inst2])
 
 
+class TestCalendarQueueMethods(unittest.TestCase):
+    '''Test cases for CalendarQueue class.'''
+
+    def setUp(self):
+        self.queue = CalendarQueue(num_buckets=4, bucket_width=1.0)
+
+    def test_push_pop(self):
+        '''Test CalendarQueue.push() and CalendarQueue.pop() return events in 
+            time order, including across resizes.'''
+        times = np.random.default_rng(0).uniform(low=0, high=50, size=40)
+        for counter, time in enumerate(times):
+            self.queue.push((time, counter))
+        self.assertTrue(len(self.queue) == 40)
+        popped = [self.queue.pop()[0] for _ in range(40)]
+        self.assertTrue(popped == sorted(times))
+        self.assertTrue(len(self.queue) == 0)
+
+    def test_peek(self):
+        '''Test CalendarQueue.peek() with an event earlier than the current bucket.'''
+        self.assertIsNone(self.queue.peek())
+        self.queue.push((7.5, 0))
+        self.queue.push((12.5, 1))
+        self.assertTrue(self.queue.pop() == (7.5, 0))
+        self.queue.push((3.0, 2))
+        self.assertTrue(self.queue.peek() == (3.0, 2))
+        self.assertTrue(len(self.queue) == 2)
+
+
 class TestFactoryMethods(unittest.TestCase):
     '''Test cases for Factory class.'''
 
@@ -246,11 +321,12 @@ class TestFactoryMethods(unittest.TestCase):
         self.process_list2 = [self.process_instance1, self.process_instance2, 
                               self.process_instance4]
         self.part_type_inst1 = PartType(
-            'test_part1', 'uniform', {'low': 1, 'high': 5}, self.process_list1)
+            'test_part1', 'uniform', {'low': 1, 'high': 5}, self.process_list1, 
+            rng=np.random.default_rng(0))
         self.part_type_inst2 = PartType(
             'test_part2', 'uniform', {'low': 1, 'high': 5}, self.process_list2)
         self.part_type_list = [self.part_type_inst1, self.part_type_inst2]
-        self.factory = Factory(self.part_type_list)
+        self.factory = Factory(self.part_type_list, [])
 
     def test_factory_init1(self):
         '''Test Factory.__init__() part_types attribute.'''
@@ -285,12 +361,146 @@ class TestFactoryMethods(unittest.TestCase):
         sample_prod_time = 5
         self.assertIsNone(self.factory.find_crit_time_object(sample_prod_time))
 
+    def test_schedule(self):
+        '''Test Factory.schedule() and Factory.peek_crit_time_object() with a 
+            superseded critical time on the event queue.'''
+        self.process_instance3.next_crit_time[0] = 5
+        self.factory.schedule(self.process_instance3, 0)
+        self.process_instance4.next_crit_time[0] = 7
+        self.factory.schedule(self.process_instance4, 0)
+        self.process_instance3.next_crit_time[0] = 9
+        self.factory.schedule(self.process_instance3, 0)
+        self.assertTrue(self.factory.peek_crit_time_object() == 
+                        (self.process_instance4, 0))
+        self.assertTrue(self.factory.get_next_crit_time() == 7)
+
+    def test_peek_crit_time_object(self):
+        '''Test Factory.peek_crit_time_object() keeps the cached earliest event
+            current as critical times are scheduled.'''
+        self.process_instance3.next_crit_time[0] = 5
+        self.factory.schedule(self.process_instance3, 0)
+        self.assertTrue(self.factory.peek_crit_time_object() == (self.process_instance3, 0))
+        self.process_instance4.next_crit_time[0] = 3
+        self.factory.schedule(self.process_instance4, 0)
+        self.assertTrue(self.factory.peek_crit_time_object() == (self.process_instance4, 0))
+        self.process_instance4.next_crit_time[0] = 0
+        self.factory.schedule(self.process_instance4, 0)
+        self.assertTrue(self.factory.peek_crit_time_object() == (self.process_instance3, 0))
+        self.assertTrue(self.factory.get_next_crit_time() == 5)
+
+    def test_get_flagged_processes(self):
+        '''Test Factory.get_flagged_processes() reads flags from the crit_times table.'''
+        self.process_instance3.next_crit_time[0] = -1
+        self.factory.schedule(self.process_instance3, 0)
+        slot = self.factory.slot_index[(self.process_instance3, 0)]
+        self.assertTrue(self.factory.crit_times[slot] == -1)
+        self.assertTrue(self.factory.get_flagged_processes() == 
+                        [(self.process_instance3, 0)])
+
+    def test_get_num_workers_on_task(self):
+        '''Test Factory.get_num_workers_on_task() follows worker allocation and end of work.'''
+        factory = Factory(self.part_type_list, [Worker('worker1', ['test1'])])
+        task = (self.process_instance1, 0)
+        self.process_instance1.next_crit_time[0] = -1
+        factory.schedule(*task)
+        self.assertTrue(factory.get_num_workers_on_task(task) == 0)
+        factory.allocate_workers(0)
+        self.assertTrue(factory.get_num_workers_on_task(task) == 1)
+        factory.end_work(*task)
+        self.assertTrue(factory.get_num_workers_on_task(task) == 0)
+
+    def test_end_work(self):
+        '''Test Factory.end_work() frees only the workers assigned to the task.'''
+        worker1, worker2 = Worker('worker1', ['test1']), Worker('worker2', ['test2'])
+        factory = Factory(self.part_type_list, [worker1, worker2])
+        self.process_instance1.next_crit_time[0] = -1
+        self.process_instance2.next_crit_time[0] = -1
+        factory.schedule(self.process_instance1, 0)
+        factory.schedule(self.process_instance2, 0)
+        factory.allocate_workers(0)
+        self.assertTrue(factory.get_available_workers() == [])
+        factory.end_work(self.process_instance1, 0)
+        self.assertTrue(factory.get_available_workers() == [worker1])
+        self.assertTrue(worker1.task is None and worker2.task is self.process_instance2)
+
+    def test_update_factory_same_time_assignment(self):
+        '''Test Factory.update_factory() starts a part whose worker is assigned late in
+            the update, without an extra critical time at the same production time.'''
+        down = Process('down', 'uniform', {'low': 2, 'high': 4}, None)
+        up = Process('up', 'uniform', {'low': 2, 'high': 4}, None)
+        part_type_inst1 = PartType('part1', 'uniform', {'low': 1, 'high': 5}, [down])
+        part_type_inst2 = PartType('part2', 'uniform', {'low': 1, 'high': 5}, [up, down])
+        factory = Factory([part_type_inst1, part_type_inst2], [Worker('worker1', ['down'])])
+        up.parts_in_process[0] = part_type_inst2
+        up.next_crit_time[0] = 1
+        down.next_crit_time[0] = 0
+        factory.update_crit_time_dict()
+        prod_time = factory.get_next_crit_time()
+        while prod_time <= 1:
+            factory.update_factory(prod_time)
+            prod_time = factory.get_next_crit_time()
+        self.assertTrue(down.parts_in_process == [part_type_inst2])
+        self.assertTrue(factory.iterations == 2)
+
+    def test_update_factory_blocked_part(self):
+        '''Test Factory.update_factory() retries a finished part blocked by a full
+            downstream buffer once that buffer frees up.'''
+        factory = Factory(self.part_type_list, [Worker('worker1', ['test3'])])
+        self.process_instance2.parts_in_process[0] = self.part_type_inst1
+        self.process_instance2.next_crit_time[0] = 1
+        self.process_instance3.parts_in_process[0] = self.part_type_inst1
+        self.process_instance3.next_crit_time[0] = 1
+        self.process_instance3.add_to_buffer(self.part_type_inst1)
+        factory.update_crit_time_dict()
+        factory.update_factory(1)
+        self.assertTrue(self.process_instance2.parts_in_process == [None])
+        self.assertTrue(list(self.process_instance3.parts_in_buffer) == [self.part_type_inst1])
+        self.assertTrue(self.part_type_inst1.throughput == 1)
+
+    def test_match_workers_python(self):
+        '''Test Factory.match_workers_python() assigns idle, able workers in order of
+            priority.'''
+        factory = Factory(self.part_type_list, [Worker('worker1', ['test1', 'test2']),
+                                                Worker('worker2', ['test2'])])
+        slot1 = factory.slot_index[(self.process_instance1, 0)]
+        slot2 = factory.slot_index[(self.process_instance2, 0)]
+        part_slot = factory.slot_index[(self.part_type_inst1, 0)]
+        self.assertTrue(factory.match_workers_python([part_slot, slot2, slot1]) ==
+                        [(slot2, 0)])
+        self.assertTrue(list(factory._idle) == [False, True])
+
+    def test_allocate_workers_order(self):
+        '''Test Factory.allocate_workers() gives workers to the in-process part that
+            finishes soonest, also when a part arrival is due at the same time.'''
+        worker1 = Worker('worker1', ['test1', 'test2'])
+        factory = Factory(self.part_type_list, [worker1])
+        self.process_instance1.parts_in_process[0] = self.part_type_inst1
+        self.process_instance1.next_crit_time[0] = 5
+        self.process_instance2.parts_in_process[0] = self.part_type_inst2
+        self.process_instance2.next_crit_time[0] = 3
+        self.part_type_inst1.next_crit_time[0] = 3
+        factory.update_crit_time_dict()
+        self.assertTrue(factory.allocate_workers(1) == 1)
+        self.assertTrue(worker1.task is self.process_instance2)
+
+    def test_allocate_workers_unchanged(self):
+        '''Test Factory.allocate_workers() assigns nobody when nothing changed since
+            the last allocation, and resumes once work ends.'''
+        factory = Factory(self.part_type_list, [Worker('worker1', ['test1']), 
+                                                Worker('worker2', ['test2'])])
+        self.process_instance1.next_crit_time[0] = -1
+        factory.schedule(self.process_instance1, 0)
+        self.assertTrue(factory.allocate_workers(0) == 1)
+        self.assertTrue(factory.allocate_workers(0) == 0)
+        factory.end_work(self.process_instance1, 0)
+        self.process_instance1.next_crit_time[0] = -1
+        factory.schedule(self.process_instance1, 0)
+        self.assertTrue(factory.allocate_workers(0) == 1)
+
     def test_update_crit_time_dict(self):
         '''Test Factory.update_crit_time_dict() method.'''
         sample_prod_time = 5
-        np.random.seed(0)
-        pt = np.random.uniform(low=1, high=5)
-        np.random.seed(0)
+        pt = np.random.default_rng(0).uniform(low=1, high=5)
         self.part_type_inst1.update_next_crit_time(sample_prod_time)
         self.factory.update_crit_time_dict()
         test_crit_time_dict = {self.part_type_inst1: [sample_prod_time + pt], 
@@ -303,9 +513,7 @@ class TestFactoryMethods(unittest.TestCase):
     def test_get_next_crit_time1(self):
         '''Test Factory.get_next_crit_time() method, with one > 0 value in dict.'''
         sample_prod_time = 5
-        np.random.seed(0)
-        pt1 = np.random.uniform(low=1, high=5) + sample_prod_time
-        np.random.seed(0)
+        pt1 = np.random.default_rng(0).uniform(low=1, high=5) + sample_prod_time
         self.part_type_inst1.update_next_crit_time(sample_prod_time)
         self.factory.update_crit_time_dict()
         self.assertTrue(self.factory.get_next_crit_time() == pt1)
@@ -365,7 +573,7 @@ class TestFactoryMethods(unittest.TestCase):
         np.random.seed(0)
         self.factory.initialize_production()
         first_prod_time = self.factory.get_next_crit_time()
-        self.assertTrue(self.process_instance1.parts_in_buffer == [self.part_type_inst1, self.part_type_inst2])
+        self.assertTrue(list(self.process_instance1.parts_in_buffer) == [self.part_type_inst1, self.part_type_inst2])
         self.factory.update_factory(first_prod_time)
         np.random.seed(0)
         pt1 = np.random.uniform(low=1, high=5)
@@ -375,11 +583,11 @@ class TestFactoryMethods(unittest.TestCase):
         if pt1 < pt2:
             pt1 += add
             self.assertTrue(self.process_instance1.parts_in_process[0] == self.part_type_inst1)
-            self.assertTrue(self.process_instance1.parts_in_buffer == [self.part_type_inst2, self.part_type_inst1])
+            self.assertTrue(list(self.process_instance1.parts_in_buffer) == [self.part_type_inst2, self.part_type_inst1])
         else:
             pt2 += add
             self.assertTrue(self.process_instance1.parts_in_process[0] == self.part_type_inst2)
-            self.assertTrue(self.process_instance1.parts_in_buffer == [self.part_type_inst2, self.part_type_inst2])
+            self.assertTrue(list(self.process_instance1.parts_in_buffer) == [self.part_type_inst2, self.part_type_inst2])
         test_crit_time_dict = {self.part_type_inst1: [pt1], self.part_type_inst2: [pt2],
                                self.process_instance1: [proc_add], self.process_instance2: [0],
                                self.process_instance3: [0], self.process_instance4: [0]}
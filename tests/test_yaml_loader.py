@@ -2,7 +2,7 @@
 
 import os
 import unittest
-from prodsim.yaml_loader import yaml_loader
+from prodsim.yaml_loader import yaml_loader, load_simulation_time
 
 class TestYamlLoader(unittest.TestCase):
     '''Test cases for yaml_loader.py method.'''
@@ -15,5 +15,22 @@ class TestYamlLoader(unittest.TestCase):
         self.assertTrue(factory.part_types[0].process_stations[0].buffer_cap == 3)
         self.assertTrue(len(factory.all_processes) == 4)
 
+    def test_load_simulation_time(self):
+        test_dir = os.path.dirname(os.path.abspath(__file__))
+        test_file_path = os.path.join(test_dir, 'test_factory.yaml')
+        self.assertTrue(load_simulation_time(test_file_path) == 30)
+
+    def test_yaml_loader_cache(self):
+        test_dir = os.path.dirname(os.path.abspath(__file__))
+        test_file_path = os.path.join(test_dir, 'autobody_shop.yaml')
+        factory1, sim_time1 = yaml_loader(test_file_path)
+        factory2, sim_time2 = yaml_loader(test_file_path)
+        self.assertTrue(sim_time1 == sim_time2 == 1584)
+        process1 = factory1.all_processes[0]
+        process2 = factory2.all_processes[0]
+        self.assertFalse(process1 is process2)
+        self.assertTrue(process1.params == process2.params)
+        self.assertFalse(process1.params is process2.params)
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
\ No newline at end of file